@@ -38,18 +38,49 @@ import json
 # for use in sorting by a dictionary key within a list of dictionaries
 from operator import itemgetter
 
+# for returning a file's table row values as a single record
+from collections import namedtuple
+
+# for viewing the raw spectrum buffer without a per-point conversion
+import ctypes
+
 # time/date routines
 import datetime as dt
 
 # Package for parsing directories/files
 import glob
+import os
 
 # Sustem interface
 import sys
 
+# numpy for the vectorized (many times at once) lookups
+import numpy as np
+
 # GPU/Hose routines
 import hose
 
+#------------------------------------------------------------------------
+# Table row records
+
+# Header derived values for one spectrum file, as returned by
+#  GPUSpec.table_row(). The field names match the SDFITS column keys.
+SpecRow = namedtuple('SpecRow',
+                     ['datetime', 'object', 'obstime', 'experiment',
+                      'scan_name', 'scan', 'navg', 'spec_len',
+                      'spec_data_type', 'samp_len', 'samp_rate'])
+
+# Header derived values for one noise power file, as returned by
+#  GPUNoise.table_row().
+NoiseRow = namedtuple('NoiseRow',
+                      ['datetime', 'object', 'obstime', 'experiment',
+                       'scan_name', 'scan', 'accum_len', 'switch_freq',
+                       'blanking_per', 'mean_power_on', 'mean_power_off'])
+
+# numpy type of a spectral point, by SpectrumDataTypeSize (native byte
+#  order, as in hose's get_spectrum_data())
+spectrum_dtypes = {2: np.float16, 4: np.float32, 8: np.float64}
+
 #------------------------------------------------------------------------
 # Classes
 
@@ -211,11 +242,13 @@ class GPUSpec(GPUBase):
     def __init__ (self, ifile, echo=False):
         self.specdata = hose.open_spectrum_file (ifile)
         self.hdr  = self.specdata.header
-        self.data = self.specdata.get_spectrum_data()
+        # the data segment is only converted when asked for, see
+        #  spectrum() and read_spectrum_into()
+        self.data = None
 
         if (echo == True):
             self.specdata.printsummary()
-            print('{}'.format(self.data[0]))
+            print('{}'.format(self.spectrum()[0]))
             
         return
 
@@ -234,7 +267,37 @@ class GPUSpec(GPUBase):
 
     def spectrum (self):
         """Data segment"""
+        if (self.data == None):
+            self.data = self.specdata.get_spectrum_data()
         return self.data
+
+    def read_spectrum_into (self, out):
+        """
+        Copy the data segment straight into out (eg a row of a
+        preallocated array), converting to the dtype of out, without
+        building the intermediate list of spectrum(). The hose buffer
+        is viewed in place, not copied.
+        """
+        npts = self.spectrum_length()
+        dtype = spectrum_dtypes[self.spectrum_data_type_size()]
+        nbytes = npts * np.dtype(dtype).itemsize
+        ptr = self.specdata.raw_spectrum_data
+        raw = (ctypes.c_char * nbytes).from_address(
+            ctypes.addressof(ptr.contents))
+        out[:] = np.frombuffer(raw, dtype=dtype, count=npts)
+
+        return out
+
+    def table_row (self):
+        """
+        convenience function
+        returns the header derived table row values all at once as a SpecRow.
+        """
+        return SpecRow(self.start_ut(), self.source_name(), self.obstime(),
+                       self.experiment_name(), self.scan_name(),
+                       self.scan_number(), self.n_averages(),
+                       self.spectrum_length(), self.spectrum_data_type_size(),
+                       self.sample_length(), self.sample_rate())
     
         
 #------------------------------------------------------------------------
@@ -365,6 +428,18 @@ class GPUNoise(GPUBase):
                 break
     
         return mean_pwr
+
+    def table_row (self):
+        """
+        convenience function
+        returns the header derived table row values all at once as a NoiseRow.
+        """
+        return NoiseRow(self.start_ut(), self.source_name(), self.obstime(),
+                        self.experiment_name(), self.scan_name(),
+                        self.scan_number(), self.accumulation_length(),
+                        self.switching_frequency(), self.blanking_period(),
+                        self.mean_power(state='on'),
+                        self.mean_power(state='off'))
         
 #------------------------------------------------------------------------
 # Routines to import and parse a metadata file for a GPU spectrometer
@@ -640,6 +715,32 @@ class GPUMeta():
 
         return apos
 
+    def antenna_pos_at_times (self, itimes):
+        """
+        Vectorized antenna_pos_at_time() for a sequence of times (anything
+        numpy converts to datetime64, eg datetimes or a datetime64 array).
+        Returns numpy arrays az, el linearly interpolated in time, held at
+        the first/last values outside the range of the metadata.
+        Returns None, None if there is no antenna_position data.
+        """
+        apos = self.gpu_meta_parse (mtype='antenna_position')
+
+        if (apos == []):
+            return None, None
+
+        # work in integer microseconds, which float64 holds exactly
+        md_t  = np.array([i['datetime'] for i in apos],
+                         dtype='datetime64[us]').astype(np.int64)
+        md_az = np.array([i['fields']['az'] for i in apos], dtype=np.float64)
+        md_el = np.array([i['fields']['el'] for i in apos], dtype=np.float64)
+
+        t = np.asarray(itimes, dtype='datetime64[us]').astype(np.int64)
+
+        az = np.interp(t, md_t, md_az)
+        el = np.interp(t, md_t, md_el)
+
+        return az, el
+
     def antenna_target (self, echo=False):
         """
         Extract the antenna_target_status information.
@@ -892,13 +993,35 @@ def list_files (dirname = './', ftail= '.txt', echo=False):
         print ('{}'.format(files))
     return files
                 
-def construct_lists (dirname = './', echo=False):
+def first_file (dirname = './', ftail = '.fits'):
+    """
+    Path of the first file found in a directory with particular extension,
+    or None if there is none. Stops at the first match rather than
+    listing and sorting the whole directory.
+    """
+    if (not os.path.isdir(dirname)):
+        return None
+
+    with os.scandir(dirname) as entries:
+        for entry in entries:
+            # skip hidden files, as glob does
+            if ((not entry.name.startswith('.')) and
+                entry.name.endswith(ftail)):
+                return os.path.join(dirname, entry.name)
+
+    return None
+
+def construct_lists (dirname = './', echo=False, skip_converted=False):
     """
     Given a directory path, construct list of scan directory(ies) and
     associated files.
     Input: Directory name
     Output: 1 list and 4 lists of lists - list of directories, and
       Spectrum, Noise, Metadata and Fits file lists of lists.
+    If skip_converted is True, directories that already hold a FITS file
+    are not listed further (for callers that skip such directories);
+    their Spectrum, Noise and Metadata lists are empty and the Fits list
+    has just the first FITS file found.
     """
 
     # construct list of scan directories
@@ -914,10 +1037,20 @@ def construct_lists (dirname = './', echo=False):
     fm = []
     ff = []
     for n in d:
-        fs.append(list_files (dirname=n, ftail='.spec'))
-        fn.append(list_files (dirname=n, ftail='.npow'))
-        fm.append(list_files (dirname=n, ftail='.json'))
-        ff.append(list_files (dirname=n, ftail='.fits'))
+        f1 = None
+        if (skip_converted == True):
+            f1 = first_file (dirname=n, ftail='.fits')
+        if (f1 != None):
+            # already converted, will be skipped
+            fs.append([])
+            fn.append([])
+            fm.append([])
+            ff.append([f1])
+        else:
+            fs.append(list_files (dirname=n, ftail='.spec'))
+            fn.append(list_files (dirname=n, ftail='.npow'))
+            fm.append(list_files (dirname=n, ftail='.json'))
+            ff.append(list_files (dirname=n, ftail='.fits'))
         
     if (echo == True):
         for n in range(len(d)):